@@ -2,54 +2,129 @@
 """
 Backend REST API for AndroidVisionAutomator
 Handles communication between Android app and cloud LLM
+
+Serve with an ASGI worker pool so concurrent Claude round trips overlap
+instead of queueing behind a single dev-server thread:
+
+    uvicorn app:app --workers 4 --loop uvloop --http httptools
 """
 
-from flask import Flask, request, jsonify
-from services.claude_llm_client import SyncClaudeLLMClient
-import json
+from quart import Quart, Response, request
+from services.claude_llm_client import ClaudeLLMClient, INSTR_HASH
+from services.batched_client import BatchedClaudeClient
+from services.task_store import TaskStore
+import gzip
 import logging
+import os
+import orjson
 from datetime import datetime
+from uuid import uuid4
 
-app = Flask(__name__)
-logging.basicConfig(level=logging.DEBUG)
+# Brotli beats gzip on JSON payloads; fall back to gzip when absent
+try:
+    import brotli
+    _HAS_BROTLI = True
+except ImportError:
+    _HAS_BROTLI = False
+
+app = Quart(__name__)
+# Log level is configurable; DEBUG formatting on every request is too
+# expensive to hardwire in production
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)
 
-# Initialize LLM client
-llm_client = SyncClaudeLLMClient()
+# Initialize async LLM client; the hot intent/plan endpoints go through
+# a coalescing layer that batches concurrent calls
+llm_client = ClaudeLLMClient()
+batched_client = BatchedClaudeClient(llm_client)
+
+
+def json_response(payload, status: int = 200) -> Response:
+    """Serialize a response body with orjson"""
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+# Responses below this size are not worth the compression CPU
+COMPRESSION_MIN_SIZE = 500
+
+
+@app.after_request
+async def compress_response(response: Response) -> Response:
+    """Compress verbose JSON bodies when the client accepts it"""
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if response.headers.get('Content-Encoding'):
+        return response
+    if response.mimetype == 'text/event-stream':
+        # SSE bodies must not be buffered for compression
+        return response
+
+    body = await response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    if _HAS_BROTLI and 'br' in accept_encoding:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accept_encoding:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.before_serving
+async def start_batcher():
+    # Workers only share Anthropic prompt-cache entries if their static
+    # prefix bytes match; identical hashes across worker logs confirm it
+    logger.info("Static prompt prefix hash: %s", INSTR_HASH)
+    await batched_client.start()
+
+
+@app.after_serving
+async def stop_batcher():
+    await batched_client.stop()
 
-# Simple in-memory task storage (replace with database in production)
-tasks = {}
+
+# LRU-bounded task storage; survives restarts and stops unbounded growth
+tasks = TaskStore()
 
 
 @app.route('/api/intent', methods=['POST'])
-def parse_intent():
+async def parse_intent():
     """
     Parse user input to intent
-    
+
     Request: {"input": "Send message to Mom"}
     Response: {"intent": "send_message", "target_app": "WhatsApp", "entities": {...}}
     """
     try:
-        data = request.json
+        data = await request.get_json()
         user_input = data.get('input')
-        
+
         if not user_input:
-            return jsonify({"error": "No input provided"}), 400
-        
-        logger.info(f"Parsing intent: {user_input}")
-        intent = llm_client.extract_intent_sync(user_input)
-        
-        return jsonify(intent), 200
+            return json_response({"error": "No input provided"}, 400)
+
+        logger.info("Parsing intent: %s", user_input)
+        intent = await batched_client.extract_intent(
+            user_input,
+            user_id=data.get('user_id', 'default'),
+            no_cache=bool(data.get('no_cache', False))
+        )
+
+        return json_response(intent, 200)
     except Exception as e:
-        logger.error(f"Error parsing intent: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error parsing intent: %s", e)
+        return json_response({"error": str(e)}, 500)
 
 
 @app.route('/api/plan', methods=['POST'])
-def plan_task():
+async def plan_task():
     """
     Create action plan from intent and screen state
-    
+
     Request: {
         "intent": {...},
         "screen_state": {
@@ -61,71 +136,139 @@ def plan_task():
     Response: [{"action": "...", "target": "...", "value": "..."}, ...]
     """
     try:
-        data = request.json
+        data = await request.get_json()
         intent = data.get('intent')
         screen_state = data.get('screen_state')
-        
+
         if not intent or not screen_state:
-            return jsonify({"error": "Missing intent or screen_state"}), 400
-        
-        logger.info(f"Planning task for intent: {intent.get('intent')}")
-        actions = llm_client.plan_actions_sync(intent, screen_state)
-        
+            return json_response({"error": "Missing intent or screen_state"}, 400)
+
+        logger.info("Planning task for intent: %s", intent.get('intent'))
+        actions = await batched_client.plan_actions(
+            intent,
+            screen_state,
+            user_id=data.get('user_id', 'default'),
+            no_cache=bool(data.get('no_cache', False))
+        )
+
         # Save task
-        task_id = f"task_{datetime.now().timestamp()}"
-        tasks[task_id] = {
+        task_id = f"task_{uuid4().hex}"
+        tasks.put(task_id, {
             "intent": intent,
             "actions": actions,
             "screen_state": screen_state,
             "created_at": datetime.now().isoformat()
-        }
-        
-        return jsonify({
+        })
+
+        return json_response({
             "task_id": task_id,
             "actions": actions
-        }), 200
+        }, 200)
     except Exception as e:
-        logger.error(f"Error planning task: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error planning task: %s", e)
+        return json_response({"error": str(e)}, 500)
+
+
+@app.route('/api/plan/stream', methods=['POST'])
+async def plan_task_stream():
+    """
+    Stream the action plan as server-sent events
+
+    Same request shape as /api/plan; each completed action is emitted
+    as a `data:` event the moment the model finishes it, so the client
+    can start executing the first step while the rest is still decoding.
+    A final `event: done` carries the task_id.
+    """
+    try:
+        data = await request.get_json()
+        intent = data.get('intent')
+        screen_state = data.get('screen_state')
+
+        if not intent or not screen_state:
+            return json_response({"error": "Missing intent or screen_state"}, 400)
+
+        user_id = data.get('user_id', 'default')
+        no_cache = bool(data.get('no_cache', False))
+    except Exception as e:
+        logger.error("Error starting plan stream: %s", e)
+        return json_response({"error": str(e)}, 500)
+
+    logger.info("Streaming plan for intent: %s", intent.get('intent'))
+
+    async def event_stream():
+        actions = []
+        try:
+            async for action in llm_client.stream_actions(
+                intent, screen_state, user_id=user_id, no_cache=no_cache
+            ):
+                actions.append(action)
+                yield b"data: " + orjson.dumps(action) + b"\n\n"
+        except Exception as e:
+            logger.error("Error streaming plan: %s", e)
+            yield b"event: error\ndata: " + orjson.dumps({"error": str(e)}) + b"\n\n"
+            return
+
+        task_id = f"task_{uuid4().hex}"
+        tasks.put(task_id, {
+            "intent": intent,
+            "actions": actions,
+            "screen_state": screen_state,
+            "created_at": datetime.now().isoformat()
+        })
+        yield b"event: done\ndata: " + orjson.dumps({"task_id": task_id}) + b"\n\n"
+
+    return Response(event_stream(), mimetype='text/event-stream')
 
 
 @app.route('/api/verify', methods=['POST'])
-def verify_action():
+async def verify_action():
     """
     Verify if an action succeeded
-    
+
     Request: {
         "action": {...},
         "expected_state": "...",
         "actual_screen_state": {...}
     }
     Response: {"success": true/false}
+
+    Batch form — independent checks are verified concurrently:
+
+    Request: {"checks": [{"action", "expected_state", "actual_screen_state"}, ...]}
+    Response: {"results": [true/false, ...]}
     """
     try:
-        data = request.json
+        data = await request.get_json()
+
+        checks = data.get('checks')
+        if checks is not None:
+            logger.info("Verifying %d actions", len(checks))
+            results = await llm_client.verify_actions(checks)
+            return json_response({"results": results}, 200)
+
         action = data.get('action')
         expected_state = data.get('expected_state')
         actual_screen = data.get('actual_screen_state')
-        
-        logger.info(f"Verifying action: {action.get('action')}")
-        
-        success = llm_client.verify_action_success(
+
+        logger.info("Verifying action: %s", action.get('action'))
+
+        success = await llm_client.verify_action_success(
             action,
             expected_state,
             actual_screen
         )
-        
-        return jsonify({"success": success}), 200
+
+        return json_response({"success": success}, 200)
     except Exception as e:
-        logger.error(f"Error verifying action: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error verifying action: %s", e)
+        return json_response({"error": str(e)}, 500)
 
 
 @app.route('/api/replan', methods=['POST'])
-def replan_task():
+async def replan_task():
     """
     Replan after action failure
-    
+
     Request: {
         "original_intent": {...},
         "failed_action": {...},
@@ -135,41 +278,44 @@ def replan_task():
     Response: [{"action": "...", ...}, ...]
     """
     try:
-        data = request.json
+        data = await request.get_json()
         intent = data.get('original_intent')
         failed_action = data.get('failed_action')
         failure_reason = data.get('failure_reason')
         screen_state = data.get('current_screen_state')
-        
-        logger.warning(f"Replanning after failure: {failure_reason}")
-        
-        new_actions = llm_client.replan_for_failure(
+
+        logger.warning("Replanning after failure: %s", failure_reason)
+
+        new_actions = await llm_client.replan_for_failure(
             intent,
             failed_action,
             failure_reason,
             screen_state
         )
-        
-        return jsonify({"actions": new_actions}), 200
+
+        return json_response({"actions": new_actions}, 200)
     except Exception as e:
-        logger.error(f"Error replanning: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error replanning: %s", e)
+        return json_response({"error": str(e)}, 500)
 
 
 @app.route('/api/task/<task_id>', methods=['GET'])
-def get_task(task_id):
+async def get_task(task_id):
     """Get task details"""
-    if task_id in tasks:
-        return jsonify(tasks[task_id]), 200
-    return jsonify({"error": "Task not found"}), 404
+    task = tasks.get(task_id)
+    if task is not None:
+        return json_response(task, 200)
+    return json_response({"error": "Task not found"}, 404)
 
 
 @app.route('/api/health', methods=['GET'])
-def health():
+async def health():
     """Health check"""
-    return jsonify({"status": "ok", "timestamp": datetime.now().isoformat()}), 200
+    return json_response({"status": "ok", "timestamp": datetime.now().isoformat()}, 200)
 
 
 if __name__ == '__main__':
+    import uvicorn
+
     logger.info("Starting AndroidVisionAutomator Backend API")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Request coalescing for Claude calls
+Gathers in-flight prompts over a short window and dispatches them as one
+concurrent batch, so per-call API overhead overlaps under load
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("BatchedClaude")
+
+
+class BatchedClaudeClient:
+    """
+    Coalescing front-end for an async ClaudeLLMClient
+
+    Callers submit work and await a per-item future. A background task
+    drains the queue every `window_ms` and dispatches up to `max_batch`
+    calls with asyncio.gather over the shared AsyncAnthropic connection
+    pool. `concurrency_modifier` can scale the batch size based on the
+    current queue depth.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        max_batch: int = 32,
+        window_ms: int = 20,
+        concurrency_modifier: Optional[Callable[[int], int]] = None
+    ):
+        self.llm_client = llm_client
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        self.concurrency_modifier = concurrency_modifier or (lambda depth: self.max_batch)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._drain_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the background drain task"""
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain_loop())
+            self._drain_task.add_done_callback(self._on_drain_done)
+            logger.debug("Batch drain task started")
+
+    async def stop(self) -> None:
+        """Stop the drain task and fail anything still queued"""
+        task, self._drain_task = self._drain_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(asyncio.CancelledError("batch client stopped"))
+
+    def _on_drain_done(self, task: asyncio.Task) -> None:
+        """Surface unexpected drain-loop death instead of hanging callers"""
+        if task.cancelled() or task is not self._drain_task:
+            return
+        self._drain_task = None
+        exc = task.exception()
+        if exc is not None:
+            # Queued futures would otherwise wait forever; fail them now.
+            # The next submit() restarts the loop.
+            logger.error("Batch drain task died: %s", exc)
+            self._fail_pending(exc)
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        """Resolve every queued future with the given exception"""
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(exc)
+
+    async def submit(self, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Enqueue a call and await its result
+
+        coro_factory is invoked when the batch is dispatched, so the
+        underlying coroutine is created inside the gather.
+        """
+        await self.start()
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        await self.queue.put((coro_factory, future))
+        return await future
+
+    async def _drain_loop(self) -> None:
+        """Drain the queue every window_ms, dispatching each batch concurrently"""
+        while True:
+            await asyncio.sleep(self.window_ms / 1000)
+
+            if self.queue.empty():
+                continue
+
+            batch_size = min(
+                self.concurrency_modifier(self.queue.qsize()),
+                self.max_batch
+            )
+            batch = []
+            while len(batch) < batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Dispatching batch of {len(batch)} Claude calls")
+            results = await asyncio.gather(
+                *[factory() for factory, _ in batch],
+                return_exceptions=True
+            )
+
+            for (_, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    # Convenience wrappers for the hot endpoints
+
+    async def extract_intent(self, user_input: str, **kwargs) -> Any:
+        """Batched intent extraction"""
+        return await self.submit(
+            lambda: self.llm_client.extract_intent(user_input, **kwargs)
+        )
+
+    async def plan_actions(self, intent, screen_state, **kwargs) -> Any:
+        """Batched action planning"""
+        return await self.submit(
+            lambda: self.llm_client.plan_actions(intent, screen_state, **kwargs)
+        )
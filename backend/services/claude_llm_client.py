@@ -5,142 +5,669 @@ Provides intent parsing and task planning via Anthropic API
 """
 
 import anthropic
-import json
+import asyncio
+import hashlib
+import httpx
+import orjson
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List
 import os
 
-logging.basicConfig(level=logging.DEBUG)
+from .semantic_cache import SemanticCache, plan_cache_key
+from .plan_templates import LocalPlanner
+from .local_intent import LocalIntentClassifier
+
 logger = logging.getLogger("ClaudeLLM")
 
+# Read once at import; per-call os.getenv lookups hit the environment
+# dict on every client construction otherwise
+DEFAULT_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+
+# One Anthropic client per API key, shared across client instances so
+# all calls reuse the same httpx connection pool (keep-alive TLS
+# sessions) instead of paying a fresh handshake per request
+_async_clients: Dict[str, anthropic.AsyncAnthropic] = {}
+_sync_clients: Dict[str, anthropic.Anthropic] = {}
+
+
+def get_async_anthropic(api_key: str) -> anthropic.AsyncAnthropic:
+    """Return the shared AsyncAnthropic for this API key"""
+    if api_key not in _async_clients:
+        _async_clients[api_key] = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0
+                )
+            )
+        )
+    return _async_clients[api_key]
+
+
+def get_sync_anthropic(api_key: str) -> anthropic.Anthropic:
+    """Return the shared synchronous Anthropic for this API key"""
+    if api_key not in _sync_clients:
+        _sync_clients[api_key] = anthropic.Anthropic(api_key=api_key)
+    return _sync_clients[api_key]
+
+# Opt-in header for Anthropic prompt caching. NOTE: a prefix is only
+# cached once it clears Anthropic's minimum length (1024 tokens on
+# Sonnet, 2048 on Haiku); the current system blocks plus tool schemas
+# sit below that, so cache_control is inert today and becomes effective
+# only as the static prefix grows. Confirm against a live response via
+# usage.cache_creation_input_tokens / cache_read_input_tokens, logged
+# at DEBUG by _log_cache_usage.
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Static instruction blocks, one per method. These are identical on every
+# call, so they are sent as cacheable system blocks instead of being
+# re-embedded in the user prompt.
+
+INTENT_SYSTEM_PROMPT = """You are an Android automation agent. Parse the user command into a structured intent and record it with the record_intent tool."""
+
+PLAN_SYSTEM_PROMPT = """You are planning a sequence of UI automation actions to achieve a goal.
+
+Available actions:
+- open_app: Launch an application (value: package name)
+- click: Click an element (target: text or description)
+- setText: Type text into a field (value: text to type)
+- scroll: Scroll the screen (value: "up" or "down")
+- find_text: Check if text is visible (target: text to find)
+- wait: Pause briefly (value: milliseconds)
+- back: Go back (Android back button)
+- home: Go to home screen
+
+Create a minimal action sequence to achieve the intent. Be specific with element names.
+Record the sequence with the record_plan tool."""
+
+VERIFY_SYSTEM_PROMPT = """You judge whether a UI automation action succeeded, given the expected result and the actual screen state after the action.
+
+Respond with only "YES" or "NO"."""
+
+REPLAN_SYSTEM_PROMPT = """An action failed during Android UI automation. Create an alternative plan to achieve the original intent given the current screen.
+
+Available actions: open_app, click, setText, scroll, find_text, wait, back, home.
+
+Record the new sequence with the record_plan tool."""
+
+# Tool definitions used to force structured output; the model fills the
+# input_schema instead of free-texting JSON we would have to slice out
+INTENT_TOOL = {
+    "name": "record_intent",
+    "description": "Record the structured intent parsed from the user command",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "intent": {
+                "type": "string",
+                "enum": [
+                    "send_message", "open_app", "search", "find_file",
+                    "play_media", "enable_feature", "disable_feature",
+                    "navigate_to", "read_notification", "make_call",
+                    "unknown"
+                ]
+            },
+            "target_app": {"type": ["string", "null"]},
+            "confidence": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+            "entities": {
+                "type": "object",
+                "properties": {
+                    "recipient": {"type": "string"},
+                    "message": {"type": "string"},
+                    "search_query": {"type": "string"},
+                    "app_name": {"type": "string"}
+                }
+            }
+        },
+        "required": ["intent", "confidence"]
+    }
+}
+
+PLAN_TOOL = {
+    "name": "record_plan",
+    "description": "Record the planned sequence of UI automation actions",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "actions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "action": {
+                            "type": "string",
+                            "enum": [
+                                "open_app", "click", "setText", "scroll",
+                                "find_text", "wait", "back", "home"
+                            ]
+                        },
+                        "target": {"type": ["string", "null"]},
+                        "value": {"type": ["string", "null"]}
+                    },
+                    "required": ["action"]
+                }
+            }
+        },
+        "required": ["actions"]
+    }
+}
+
+# Dynamic user-message templates, precompiled once and shared by the
+# async and sync clients
+INTENT_USER_TEMPLATE = 'User command: "{user_input}"'
+
+PLAN_USER_TEMPLATE = """User's intent:
+- Action: {intent}
+- Target app: {target_app}
+- Details: {entities}
+
+Current screen state:
+- Active app: {current_app}
+- Visible elements: {visible_texts}
+- Focused element: {focused_element}"""
+
+VERIFY_USER_TEMPLATE = """Action: {action}
+Expected result: {expected_state}
+
+Actual screen after action:
+- App: {current_app}
+- Visible text: {visible_texts}"""
+
+REPLAN_USER_TEMPLATE = """Original intent: {intent}
+Failed action: {failed_action}
+Reason: {failure_reason}
+
+Current screen:
+- App: {current_app}
+- Visible: {visible_texts}"""
+
+
+# Accessibility trees repeat the same labels many times; prompts only
+# need each text once, and a bounded number of them
+MAX_VISIBLE_TEXTS = 40
+MAX_VISIBLE_TEXT_LEN = 80
+
+
+def trim_visible_texts(screen_state: Dict[str, Any]) -> List[str]:
+    """Dedupe visible_texts (order-preserving) and cap count and length"""
+    texts = screen_state.get('visible_texts') or []
+    seen = set()
+    trimmed = []
+    for text in texts:
+        text = str(text).strip()[:MAX_VISIBLE_TEXT_LEN]
+        key = text.casefold()
+        if text and key not in seen:
+            seen.add(key)
+            trimmed.append(text)
+        if len(trimmed) >= MAX_VISIBLE_TEXTS:
+            break
+    return trimmed
+
+
+def quick_verify(
+    action: Dict[str, Any],
+    expected_state: str,
+    actual_screen_state: Dict[str, Any]
+) -> Optional[bool]:
+    """
+    Deterministic verification for checks the screen state answers
+    directly; returns None when only the LLM can judge
+    """
+    visible = [str(t).lower() for t in actual_screen_state.get('visible_texts') or []]
+    current_app = (actual_screen_state.get('current_app') or '').lower()
+    kind = action.get('action')
+    target = (action.get('target') or '').lower()
+    value = (action.get('value') or '').lower()
+
+    if kind == 'open_app' and value and current_app:
+        # A lexical match against the foreground package is decisive,
+        # but a miss is not: value often holds the human app name
+        # ("Messages") while current_app is the package
+        # (com.google.android.apps.messaging), so defer misses to the LLM
+        if value in current_app or current_app in value:
+            return True
+
+    if kind == 'find_text' and target:
+        # find_text is literally "is this text visible"
+        return any(target in text for text in visible)
+
+    if kind == 'setText' and value:
+        # Text fields echo their content into the accessibility tree
+        if any(value in text for text in visible):
+            return True
+
+    if expected_state:
+        # Expected text already on screen is decisive for any action
+        if any(expected_state.lower() in text for text in visible):
+            return True
+
+    return None
+
+
+def render_intent_user(user_input: str) -> str:
+    """Render the dynamic part of the intent prompt"""
+    return INTENT_USER_TEMPLATE.format(user_input=user_input)
+
+
+def render_plan_user(intent: Dict[str, Any], screen_state: Dict[str, Any]) -> str:
+    """Render the dynamic part of the planning prompt"""
+    return PLAN_USER_TEMPLATE.format(
+        intent=intent.get('intent'),
+        target_app=intent.get('target_app', 'N/A'),
+        entities=orjson.dumps(intent.get('entities', {})).decode(),
+        current_app=screen_state.get('current_app', 'unknown'),
+        visible_texts=trim_visible_texts(screen_state),
+        focused_element=screen_state.get('focused_element', 'N/A')
+    )
+
+
+def render_verify_user(
+    action: Dict[str, Any],
+    expected_state: str,
+    actual_screen_state: Dict[str, Any]
+) -> str:
+    """Render the dynamic part of the verification prompt"""
+    return VERIFY_USER_TEMPLATE.format(
+        action=f"{action.get('action')} {action.get('target') or action.get('value') or ''}",
+        expected_state=expected_state,
+        current_app=actual_screen_state.get('current_app'),
+        visible_texts=trim_visible_texts(actual_screen_state)
+    )
+
+
+def render_replan_user(
+    original_intent: Dict[str, Any],
+    failed_action: Dict[str, Any],
+    failure_reason: str,
+    current_screen_state: Dict[str, Any]
+) -> str:
+    """Render the dynamic part of the replanning prompt"""
+    return REPLAN_USER_TEMPLATE.format(
+        intent=original_intent.get('intent'),
+        failed_action=f"{failed_action.get('action')} {failed_action.get('target') or failed_action.get('value')}",
+        failure_reason=failure_reason,
+        current_app=current_screen_state.get('current_app'),
+        visible_texts=trim_visible_texts(current_screen_state)
+    )
+
+
+def _cacheable(text: str) -> List[Dict[str, Any]]:
+    """Wrap a static prompt as a cache-marked system block list"""
+    return [{"type": "text", "text": text, "cache_control": CACHE_CONTROL}]
+
+
+# Precomputed cacheable system blocks, one entry per method
+SYSTEM_BLOCKS = {
+    "intent": _cacheable(INTENT_SYSTEM_PROMPT),
+    "plan": _cacheable(PLAN_SYSTEM_PROMPT),
+    "verify": _cacheable(VERIFY_SYSTEM_PROMPT),
+    "replan": _cacheable(REPLAN_SYSTEM_PROMPT),
+}
+
+# Fingerprint of the static prompt prefix (system blocks + tool
+# schemas). Once the prefix is long enough to cache, hits require every
+# worker to send these bytes identically; log this at boot and compare
+# across workers to confirm they share one cache key.
+INSTR_HASH = hashlib.sha256(
+    orjson.dumps(
+        {"system": SYSTEM_BLOCKS, "tools": [INTENT_TOOL, PLAN_TOOL]},
+        option=orjson.OPT_SORT_KEYS
+    )
+).hexdigest()
+
+
+def _log_cache_usage(message: Any) -> None:
+    """Log the prompt-cache counters from a response at DEBUG"""
+    usage = getattr(message, "usage", None)
+    if usage is None or not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug(
+        "Prompt cache usage: created=%s read=%s",
+        getattr(usage, "cache_creation_input_tokens", None),
+        getattr(usage, "cache_read_input_tokens", None)
+    )
+
+
+class _ActionStreamParser:
+    """
+    Incremental extractor for the streaming record_plan tool input
+
+    Feed raw input_json_delta fragments; completed action objects are
+    returned as soon as their closing brace arrives, without waiting
+    for the rest of the array.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        """Consume a fragment, returning any actions completed by it"""
+        completed = []
+        for char in fragment:
+            if not self._in_array:
+                # Skip the {"actions": prelude up to the array open
+                if char == '[':
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._buf = ['{']
+                continue
+
+            self._buf.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(orjson.loads("".join(self._buf)))
+                    except orjson.JSONDecodeError:
+                        logger.error("Malformed streamed action: %s", "".join(self._buf))
+                    self._buf = []
+        return completed
+
 
 class ClaudeLLMClient:
     """
-    Cloud LLM interface using Claude 3.5 Sonnet
+    Async cloud LLM interface using Claude 3.5 Sonnet
+
+    Built on anthropic.AsyncAnthropic so concurrent requests overlap
+    their network wait instead of serializing.
     """
-    
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        semantic_cache: Optional[SemanticCache] = None
+    ):
+        self.api_key = api_key or DEFAULT_API_KEY
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not set")
-        
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+
+        self.client = get_async_anthropic(self.api_key)
         self.model = "claude-3-5-sonnet-20241022"
-    
+        # Verification is a one-token YES/NO judgment; Haiku is an order
+        # of magnitude cheaper and faster at it than Sonnet
+        self.verification_model = "claude-3-5-haiku-20241022"
+        self.system_blocks = SYSTEM_BLOCKS
+        self.semantic_cache = semantic_cache or SemanticCache()
+        self.local_planner = LocalPlanner(self.semantic_cache)
+        self.local_intent = LocalIntentClassifier()
+
     async def complete(self, prompt: str, max_tokens: int = 1024) -> str:
         """
         Complete a prompt using Claude
         """
         try:
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model=self.model,
                 max_tokens=max_tokens,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
-            
+
             response = message.content[0].text
-            logger.debug(f"Claude response: {response[:100]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Claude response: {response[:100]}...")
             return response
         except Exception as e:
             logger.error(f"Claude API error: {e}")
             raise
-    
-    async def extract_intent(self, user_input: str) -> Dict[str, Any]:
+
+    async def complete_cached(
+        self,
+        system_key: str,
+        user_content: str,
+        max_tokens: int = 1024,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Complete with a cached static system block; only user_content
+        is re-processed on cache hits
+        """
+        try:
+            async with self.client.messages.stream(
+                model=model or self.model,
+                max_tokens=max_tokens,
+                system=self.system_blocks[system_key],
+                messages=[
+                    {"role": "user", "content": user_content}
+                ],
+                extra_headers=PROMPT_CACHING_HEADERS
+            ) as stream:
+                parts: List[str] = []
+                async for text in stream.text_stream:
+                    parts.append(text)
+                _log_cache_usage(await stream.get_final_message())
+
+            response = "".join(parts)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Claude response: {response[:100]}...")
+            return response
+        except Exception as e:
+            logger.error(f"Claude API error: {e}")
+            raise
+
+    async def complete_tool(
+        self,
+        system_key: str,
+        tool: Dict[str, Any],
+        user_content: str,
+        max_tokens: int = 1024
+    ) -> Dict[str, Any]:
+        """
+        Complete with a forced tool call and return the structured tool
+        input; the tool schema rides in the cached prefix alongside the
+        system block
+        """
+        try:
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=max_tokens,
+                system=self.system_blocks[system_key],
+                tools=[tool],
+                tool_choice={"type": "tool", "name": tool["name"]},
+                messages=[
+                    {"role": "user", "content": user_content}
+                ],
+                extra_headers=PROMPT_CACHING_HEADERS
+            ) as stream:
+                # Accumulate the tool input as it streams in, so parsing
+                # overlaps decode instead of waiting on the full response
+                json_parts: List[str] = []
+                async for event in stream:
+                    if (
+                        event.type == "content_block_delta"
+                        and event.delta.type == "input_json_delta"
+                    ):
+                        json_parts.append(event.delta.partial_json)
+                message = await stream.get_final_message()
+                _log_cache_usage(message)
+        except Exception as e:
+            logger.error(f"Claude API error: {e}")
+            raise
+
+        if json_parts:
+            try:
+                return orjson.loads("".join(json_parts))
+            except orjson.JSONDecodeError:
+                pass
+
+        for block in message.content:
+            if block.type == "tool_use" and block.name == tool["name"]:
+                return block.input
+
+        raise ValueError(f"No {tool['name']} tool call in response")
+
+    async def extract_intent(
+        self,
+        user_input: str,
+        user_id: str = "default",
+        no_cache: bool = False
+    ) -> Dict[str, Any]:
         """
         Parse user command to intent
         """
-        prompt = f"""You are an Android automation agent. Parse this user command into a structured intent.
-
-User command: "{user_input}"
-
-Respond with ONLY valid JSON in this format:
-{{
-  "intent": "one of: send_message, open_app, search, find_file, play_media, enable_feature, disable_feature, navigate_to, read_notification, make_call",
-  "target_app": "app name if applicable, or null",
-  "confidence": 0.0-1.0,
-  "entities": {{
-    "recipient": "contact name if applicable",
-    "message": "message text if applicable",
-    "search_query": "search term if applicable",
-    "app_name": "target app if applicable"
-  }}
-}}"""
-        
-        response = await self.complete(prompt, max_tokens=512)
-        
+        local = self.local_intent.classify(user_input)
+        if local is not None:
+            return local
+
+        namespace = f"intent:{user_id}"
+        if not no_cache:
+            # Embedding and sqlite access are blocking; run them on a
+            # worker thread so the event loop keeps serving
+            cached = await asyncio.to_thread(
+                self.semantic_cache.get, namespace, user_input
+            )
+            if cached is not None:
+                return cached
+
+        user_content = render_intent_user(user_input)
+
         try:
-            # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-        
-        logger.error(f"Failed to parse intent from: {response}")
-        return {
-            "intent": "unknown",
-            "target_app": None,
-            "confidence": 0.0,
-            "entities": {}
-        }
-    
+            result = await self.complete_tool(
+                "intent", INTENT_TOOL, user_content, max_tokens=512
+            )
+        except ValueError as e:
+            logger.error(f"Failed to parse intent: {e}")
+            return {
+                "intent": "unknown",
+                "target_app": None,
+                "confidence": 0.0,
+                "entities": {}
+            }
+
+        result.setdefault("target_app", None)
+        result.setdefault("entities", {})
+        await asyncio.to_thread(
+            self.semantic_cache.put, namespace, user_input, result
+        )
+        return result
+
     async def plan_actions(
         self,
         intent: Dict[str, Any],
-        screen_state: Dict[str, Any]
+        screen_state: Dict[str, Any],
+        user_id: str = "default",
+        no_cache: bool = False
     ) -> list:
         """
         Convert intent + screen state to action sequence
         """
-        
-        prompt = f"""You are planning a sequence of UI automation actions to achieve a goal.
-
-User's intent:
-- Action: {intent.get('intent')}
-- Target app: {intent.get('target_app', 'N/A')}
-- Details: {json.dumps(intent.get('entities', {}))}
+        # Template matching may embed the intent; keep it off the loop
+        local_plan = await asyncio.to_thread(
+            self.local_planner.plan, intent, screen_state
+        )
+        if local_plan is not None:
+            return local_plan
 
-Current screen state:
-- Active app: {screen_state.get('current_app', 'unknown')}
-- Visible elements: {screen_state.get('visible_texts', [])}
-- Focused element: {screen_state.get('focused_element', 'N/A')}
+        namespace = f"plan:{user_id}"
+        cache_key = plan_cache_key(intent, screen_state)
+        if not no_cache:
+            cached = await asyncio.to_thread(
+                self.semantic_cache.get, namespace, cache_key
+            )
+            if cached is not None:
+                return cached
 
-Available actions:
-- open_app: Launch an application (value: package name)
-- click: Click an element (target: text or description)
-- setText: Type text into a field (value: text to type)
-- scroll: Scroll the screen (value: "up" or "down")
-- find_text: Check if text is visible (target: text to find)
-- wait: Pause briefly (value: milliseconds)
-- back: Go back (Android back button)
-- home: Go to home screen
+        user_content = render_plan_user(intent, screen_state)
 
-Create a minimal action sequence to achieve the intent. Be specific with element names.
-Respond with ONLY a JSON array, no explanation:
-
-[
-  {{"action": "action_name", "target": "element text or null", "value": "value or null"}},
-  ...
-]"""
-        
-        response = await self.complete(prompt, max_tokens=1024)
-        
         try:
-            # Extract JSON array
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse actions from: {response}")
-        
-        return []
-    
+            result = await self.complete_tool(
+                "plan", PLAN_TOOL, user_content, max_tokens=1024
+            )
+        except ValueError as e:
+            logger.error(f"Failed to parse actions: {e}")
+            return []
+
+        actions = result.get("actions", [])
+        await asyncio.to_thread(
+            self.semantic_cache.put, namespace, cache_key, actions
+        )
+        return actions
+
+    async def stream_actions(
+        self,
+        intent: Dict[str, Any],
+        screen_state: Dict[str, Any],
+        user_id: str = "default",
+        no_cache: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Plan actions, yielding each one as soon as the model finishes
+        it — the executor can start the first step while the rest of
+        the plan is still decoding
+        """
+        local_plan = await asyncio.to_thread(
+            self.local_planner.plan, intent, screen_state
+        )
+        if local_plan is not None:
+            for action in local_plan:
+                yield action
+            return
+
+        namespace = f"plan:{user_id}"
+        cache_key = plan_cache_key(intent, screen_state)
+        if not no_cache:
+            cached = await asyncio.to_thread(
+                self.semantic_cache.get, namespace, cache_key
+            )
+            if cached is not None:
+                for action in cached:
+                    yield action
+                return
+
+        user_content = render_plan_user(intent, screen_state)
+        parser = _ActionStreamParser()
+        actions: List[Dict[str, Any]] = []
+
+        async with self.client.messages.stream(
+            model=self.model,
+            max_tokens=1024,
+            system=self.system_blocks["plan"],
+            tools=[PLAN_TOOL],
+            tool_choice={"type": "tool", "name": PLAN_TOOL["name"]},
+            messages=[
+                {"role": "user", "content": user_content}
+            ],
+            extra_headers=PROMPT_CACHING_HEADERS
+        ) as stream:
+            async for event in stream:
+                if (
+                    event.type == "content_block_delta"
+                    and event.delta.type == "input_json_delta"
+                ):
+                    for action in parser.feed(event.delta.partial_json):
+                        actions.append(action)
+                        yield action
+            _log_cache_usage(await stream.get_final_message())
+
+        await asyncio.to_thread(
+            self.semantic_cache.put, namespace, cache_key, actions
+        )
+
     async def verify_action_success(
         self,
         action: Dict[str, Any],
@@ -150,21 +677,37 @@ Respond with ONLY a JSON array, no explanation:
         """
         Verify if action achieved expected result
         """
-        
-        prompt = f"""Did this UI automation action succeed?
 
-Action: {action.get('action')} {action.get('target') or action.get('value') or ''}
-Expected result: {expected_state}
+        quick = quick_verify(action, expected_state, actual_screen_state)
+        if quick is not None:
+            return quick
 
-Actual screen after action:
-- App: {actual_screen_state.get('current_app')}
-- Visible text: {actual_screen_state.get('visible_texts', [])}
+        user_content = render_verify_user(action, expected_state, actual_screen_state)
 
-Respond with only "YES" or "NO"."""
-        
-        response = await self.complete(prompt, max_tokens=10)
+        response = await self.complete_cached(
+            "verify", user_content, max_tokens=10, model=self.verification_model
+        )
         return "YES" in response.upper()
-    
+
+    async def verify_actions(
+        self,
+        checks: List[Dict[str, Any]]
+    ) -> List[bool]:
+        """
+        Verify several independent actions concurrently
+
+        Each check is {"action", "expected_state", "actual_screen_state"};
+        the underlying calls overlap on the shared connection pool.
+        """
+        return await asyncio.gather(*[
+            self.verify_action_success(
+                check["action"],
+                check["expected_state"],
+                check["actual_screen_state"]
+            )
+            for check in checks
+        ])
+
     async def replan_for_failure(
         self,
         original_intent: Dict[str, Any],
@@ -175,38 +718,44 @@ Respond with only "YES" or "NO"."""
         """
         Create alternative action sequence after failure
         """
-        
-        prompt = f"""An action failed during automation. Create an alternative plan.
 
-Original intent: {original_intent.get('intent')}
-Failed action: {failed_action.get('action')} {failed_action.get('target') or failed_action.get('value')}
-Reason: {failure_reason}
+        user_content = render_replan_user(
+            original_intent, failed_action, failure_reason, current_screen_state
+        )
 
-Current screen:
-- App: {current_screen_state.get('current_app')}
-- Visible: {current_screen_state.get('visible_texts', [])}
-
-Alternative approach? Return JSON action array:
-[{{"action": "...", "target": "...", "value": "..."}}, ...]"""
-        
-        response = await self.complete(prompt, max_tokens=1024)
-        
         try:
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-        
-        return []
-
-
-# Synchronous wrapper for Android integration
-class SyncClaudeLLMClient(ClaudeLLMClient):
-    """Synchronous version for easier Android integration"""
-    
+            result = await self.complete_tool(
+                "replan", PLAN_TOOL, user_content, max_tokens=1024
+            )
+        except ValueError as e:
+            logger.error(f"Failed to parse replan actions: {e}")
+            return []
+
+        return result.get("actions", [])
+
+
+# Synchronous client kept for CLI examples and scripts; the server uses
+# the async ClaudeLLMClient
+class SyncClaudeLLMClient:
+    """Synchronous version for easier scripting"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        semantic_cache: Optional[SemanticCache] = None
+    ):
+        self.api_key = api_key or DEFAULT_API_KEY
+        if not self.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not set")
+
+        self.client = get_sync_anthropic(self.api_key)
+        self.model = "claude-3-5-sonnet-20241022"
+        self.verification_model = "claude-3-5-haiku-20241022"
+        self.system_blocks = SYSTEM_BLOCKS
+        self.semantic_cache = semantic_cache or SemanticCache()
+        self.local_planner = LocalPlanner(self.semantic_cache)
+        self.local_intent = LocalIntentClassifier()
+
     def complete_sync(self, prompt: str, max_tokens: int = 1024) -> str:
         """Synchronous version of complete()"""
         message = self.client.messages.create(
@@ -217,59 +766,176 @@ class SyncClaudeLLMClient(ClaudeLLMClient):
             ]
         )
         return message.content[0].text
-    
-    def extract_intent_sync(self, user_input: str) -> Dict[str, Any]:
+
+    def complete_cached_sync(
+        self,
+        system_key: str,
+        user_content: str,
+        max_tokens: int = 1024,
+        model: Optional[str] = None
+    ) -> str:
+        """Synchronous version of complete_cached()"""
+        message = self.client.messages.create(
+            model=model or self.model,
+            max_tokens=max_tokens,
+            system=self.system_blocks[system_key],
+            messages=[
+                {"role": "user", "content": user_content}
+            ],
+            extra_headers=PROMPT_CACHING_HEADERS
+        )
+        return message.content[0].text
+
+    def complete_tool_sync(
+        self,
+        system_key: str,
+        tool: Dict[str, Any],
+        user_content: str,
+        max_tokens: int = 1024
+    ) -> Dict[str, Any]:
+        """Synchronous version of complete_tool()"""
+        with self.client.messages.stream(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=self.system_blocks[system_key],
+            tools=[tool],
+            tool_choice={"type": "tool", "name": tool["name"]},
+            messages=[
+                {"role": "user", "content": user_content}
+            ],
+            extra_headers=PROMPT_CACHING_HEADERS
+        ) as stream:
+            json_parts: List[str] = []
+            for event in stream:
+                if (
+                    event.type == "content_block_delta"
+                    and event.delta.type == "input_json_delta"
+                ):
+                    json_parts.append(event.delta.partial_json)
+            message = stream.get_final_message()
+
+        if json_parts:
+            try:
+                return orjson.loads("".join(json_parts))
+            except orjson.JSONDecodeError:
+                pass
+
+        for block in message.content:
+            if block.type == "tool_use" and block.name == tool["name"]:
+                return block.input
+
+        raise ValueError(f"No {tool['name']} tool call in response")
+
+    def extract_intent_sync(
+        self,
+        user_input: str,
+        user_id: str = "default",
+        no_cache: bool = False
+    ) -> Dict[str, Any]:
         """Synchronous intent extraction"""
-        prompt = f"""Parse this Android automation command:
-"{user_input}"
-
-JSON format:
-{{"intent": "...", "target_app": "...", "entities": {{...}}}}"""
-        
-        response = self.complete_sync(prompt, max_tokens=512)
-        
+        local = self.local_intent.classify(user_input)
+        if local is not None:
+            return local
+
+        namespace = f"intent:{user_id}"
+        if not no_cache:
+            cached = self.semantic_cache.get(namespace, user_input)
+            if cached is not None:
+                return cached
+
+        user_content = render_intent_user(user_input)
+
         try:
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0:
-                return json.loads(response[json_start:json_end])
-        except json.JSONDecodeError:
-            pass
-        
-        return {"intent": "unknown", "target_app": None, "entities": {}}
-    
+            result = self.complete_tool_sync(
+                "intent", INTENT_TOOL, user_content, max_tokens=512
+            )
+        except ValueError:
+            return {"intent": "unknown", "target_app": None, "entities": {}}
+
+        result.setdefault("target_app", None)
+        result.setdefault("entities", {})
+        self.semantic_cache.put(namespace, user_input, result)
+        return result
+
     def plan_actions_sync(
         self,
         intent: Dict[str, Any],
-        screen_state: Dict[str, Any]
+        screen_state: Dict[str, Any],
+        user_id: str = "default",
+        no_cache: bool = False
     ) -> list:
         """Synchronous action planning"""
-        prompt = f"""Plan UI actions for: {intent.get('intent')}
-Current app: {screen_state.get('current_app')}
-Visible: {screen_state.get('visible_texts', [])}
-
-JSON array only."""
-        
-        response = self.complete_sync(prompt, max_tokens=1024)
-        
+        local_plan = self.local_planner.plan(intent, screen_state)
+        if local_plan is not None:
+            return local_plan
+
+        namespace = f"plan:{user_id}"
+        cache_key = plan_cache_key(intent, screen_state)
+        if not no_cache:
+            cached = self.semantic_cache.get(namespace, cache_key)
+            if cached is not None:
+                return cached
+
+        user_content = render_plan_user(intent, screen_state)
+
         try:
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            if json_start >= 0:
-                return json.loads(response[json_start:json_end])
-        except json.JSONDecodeError:
-            pass
-        
-        return []
+            result = self.complete_tool_sync(
+                "plan", PLAN_TOOL, user_content, max_tokens=1024
+            )
+        except ValueError:
+            return []
+
+        actions = result.get("actions", [])
+        self.semantic_cache.put(namespace, cache_key, actions)
+        return actions
+
+    def verify_action_success(
+        self,
+        action: Dict[str, Any],
+        expected_state: str,
+        actual_screen_state: Dict[str, Any]
+    ) -> bool:
+        """Synchronous action verification"""
+        quick = quick_verify(action, expected_state, actual_screen_state)
+        if quick is not None:
+            return quick
+
+        user_content = render_verify_user(action, expected_state, actual_screen_state)
+
+        response = self.complete_cached_sync(
+            "verify", user_content, max_tokens=10, model=self.verification_model
+        )
+        return "YES" in response.upper()
+
+    def replan_for_failure(
+        self,
+        original_intent: Dict[str, Any],
+        failed_action: Dict[str, Any],
+        failure_reason: str,
+        current_screen_state: Dict[str, Any]
+    ) -> list:
+        """Synchronous replanning after a failed action"""
+        user_content = render_replan_user(
+            original_intent, failed_action, failure_reason, current_screen_state
+        )
+
+        try:
+            result = self.complete_tool_sync(
+                "replan", PLAN_TOOL, user_content, max_tokens=1024
+            )
+        except ValueError:
+            return []
+
+        return result.get("actions", [])
 
 
 if __name__ == "__main__":
     import asyncio
-    
+
     async def test():
         client = ClaudeLLMClient()
-        
+
         intent = await client.extract_intent("Send a message to Mom saying I'll be late")
-        print(f"Intent: {json.dumps(intent, indent=2)}")
-    
+        print(f"Intent: {orjson.dumps(intent, option=orjson.OPT_INDENT_2).decode()}")
+
     asyncio.run(test())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Local intent fast path
+Unambiguous commands ("open WhatsApp", "call Mom") are classified
+on-box without any cloud round trip; everything else escalates to
+Claude
+"""
+
+import logging
+import re
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger("LocalIntent")
+
+# Each pattern maps a command shape to a fully-resolved intent.
+# Confidence is fixed at 0.95: these shapes are unambiguous, but still
+# below a cloud-parsed 1.0 so downstream thresholds can distinguish.
+RULE_CONFIDENCE = 0.95
+
+# App names are short; anything longer is a phrase ("the file I
+# downloaded yesterday") that needs real parsing. Filler words in the
+# capture mean the same thing.
+_APP_NAME_MAX_WORDS = 3
+_FILLER_WORDS = {
+    "the", "a", "an", "my", "this", "that", "and", "then",
+    "file", "files", "it", "up",
+}
+
+
+def _looks_like_app_name(name: str) -> bool:
+    """Reject captures that are phrases rather than app names"""
+    words = name.lower().split()
+    if not words or len(words) > _APP_NAME_MAX_WORDS:
+        return False
+    return not any(word in _FILLER_WORDS for word in words)
+
+
+def _build_open_app(m) -> Optional[Dict[str, Any]]:
+    app_name = m.group("app_name").strip()
+    if not _looks_like_app_name(app_name):
+        return None
+    return {
+        "intent": "open_app",
+        "target_app": app_name,
+        "entities": {"app_name": app_name},
+    }
+
+
+_RULES = [
+    (
+        re.compile(r"^(?:open|launch|start)\s+(?P<app_name>[\w .'-]+?)[.!]?$", re.I),
+        _build_open_app,
+    ),
+    (
+        re.compile(r"^call\s+(?P<recipient>[\w .'-]+?)[.!]?$", re.I),
+        lambda m: {
+            "intent": "make_call",
+            "target_app": None,
+            "entities": {"recipient": m.group("recipient").strip()},
+        },
+    ),
+    (
+        re.compile(
+            r"^(?:text|message|send (?:a )?message to)\s+(?P<recipient>[\w .'-]+?)"
+            r"\s+(?:saying|that)\s+(?P<message>.+?)[.!]?$",
+            re.I,
+        ),
+        lambda m: {
+            "intent": "send_message",
+            "target_app": None,
+            "entities": {
+                "recipient": m.group("recipient").strip(),
+                "message": m.group("message").strip(),
+            },
+        },
+    ),
+    (
+        re.compile(r"^search(?:\s+for)?\s+(?P<search_query>.+?)[.!]?$", re.I),
+        lambda m: {
+            "intent": "search",
+            "target_app": None,
+            "entities": {"search_query": m.group("search_query").strip()},
+        },
+    ),
+    (
+        re.compile(r"^play\s+(?P<search_query>.+?)[.!]?$", re.I),
+        lambda m: {
+            "intent": "play_media",
+            "target_app": None,
+            "entities": {"search_query": m.group("search_query").strip()},
+        },
+    ),
+]
+
+
+class LocalIntentClassifier:
+    """
+    On-box intent classifier, tried before any cloud call
+
+    A set of compiled command-shape rules covers the most frequent
+    commands; builders can veto a lexical match that does not hold up
+    semantically (e.g. "open the file I downloaded"). Returns None for
+    anything ambiguous, and the caller escalates to Claude.
+    """
+
+    def classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Classify a command locally, or None to escalate to the cloud"""
+        text = user_input.strip()
+
+        for pattern, build in _RULES:
+            match = pattern.match(text)
+            if match:
+                intent = build(match)
+                if intent is None:
+                    continue
+                intent["confidence"] = RULE_CONFIDENCE
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Local rule matched intent '%s'", intent["intent"])
+                return intent
+
+        return None
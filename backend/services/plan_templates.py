@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Local plan retrieval for common intents
+Well-known intents (send a message, open an app, search) map to
+parameterized action templates, so planning skips the LLM entirely when
+the required entities are present
+"""
+
+import logging
+from typing import Optional, Dict, Any, List
+
+from .semantic_cache import SemanticCache
+
+logger = logging.getLogger("PlanTemplates")
+
+# Parameterized plans for the common intents. Placeholders are filled
+# from the parsed intent; a template only applies when every placeholder
+# resolves.
+PLAN_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "send_message": {
+        "description": "send a text message to a contact",
+        "requires": ["target_app", "recipient", "message"],
+        "actions": [
+            {"action": "open_app", "target": None, "value": "{target_app}"},
+            {"action": "click", "target": "{recipient}", "value": None},
+            {"action": "click", "target": "message input", "value": None},
+            {"action": "setText", "target": None, "value": "{message}"},
+            {"action": "click", "target": "send", "value": None},
+        ],
+    },
+    "open_app": {
+        "description": "open or launch an application",
+        "requires": ["target_app"],
+        "actions": [
+            {"action": "open_app", "target": None, "value": "{target_app}"},
+        ],
+    },
+    "search": {
+        "description": "search for something in an app",
+        "requires": ["target_app", "search_query"],
+        "actions": [
+            {"action": "open_app", "target": None, "value": "{target_app}"},
+            {"action": "click", "target": "search", "value": None},
+            {"action": "setText", "target": None, "value": "{search_query}"},
+        ],
+    },
+    "navigate_to": {
+        "description": "navigate to a screen or destination",
+        "requires": ["target_app"],
+        "actions": [
+            {"action": "open_app", "target": None, "value": "{target_app}"},
+        ],
+    },
+}
+
+# Similarity needed before a free-text intent is mapped onto a template
+TEMPLATE_MATCH_THRESHOLD = 0.85
+
+# open_app's value contract is a package name — the Android executor
+# feeds it straight to getLaunchIntentForPackage — but parsed intents
+# carry the human app name ("WhatsApp"). Known names resolve here; an
+# unknown name makes the template inapplicable and planning escalates
+# to the LLM instead of emitting an unlaunchable action.
+APP_PACKAGES: Dict[str, str] = {
+    "whatsapp": "com.whatsapp",
+    "messages": "com.google.android.apps.messaging",
+    "maps": "com.google.android.apps.maps",
+    "google maps": "com.google.android.apps.maps",
+    "youtube": "com.google.android.youtube",
+    "google": "com.google.android.googlequicksearchbox",
+    "chrome": "com.android.chrome",
+    "gmail": "com.google.android.gm",
+    "settings": "com.android.settings",
+    "phone": "com.google.android.dialer",
+    "contacts": "com.google.android.contacts",
+    "camera": "com.google.android.GoogleCamera",
+    "photos": "com.google.android.apps.photos",
+    "calendar": "com.google.android.calendar",
+    "play store": "com.android.vending",
+    "spotify": "com.spotify.music",
+    "telegram": "org.telegram.messenger",
+    "instagram": "com.instagram.android",
+}
+
+
+def resolve_pkg(app_name: str) -> Optional[str]:
+    """
+    Resolve a human app name to its launchable package, passing through
+    anything that already looks like a package; None means unknown
+    """
+    name = app_name.strip()
+    if "." in name and " " not in name:
+        return name
+    return APP_PACKAGES.get(name.casefold())
+
+
+class LocalPlanner:
+    """
+    Template-based planner for common intents
+
+    Canonical intents resolve by name; free-text intents fall back to an
+    embedding match against pre-embedded template descriptions (shared
+    embedder with the semantic cache). Returns None when no template
+    applies, in which case the caller escalates to the LLM.
+    """
+
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None):
+        self.cache = semantic_cache
+        self.template_embeddings: Dict[str, List[float]] = {}
+
+        if self.cache is not None and self.cache.enabled:
+            # Pre-embed the catalog once at startup
+            for name, template in PLAN_TEMPLATES.items():
+                self.template_embeddings[name] = self.cache.embed(
+                    template["description"]
+                )
+
+    def _match_template(self, intent_name: str) -> Optional[str]:
+        """Resolve an intent to a template name, exactly or by embedding"""
+        if intent_name in PLAN_TEMPLATES:
+            return intent_name
+
+        if not self.template_embeddings:
+            return None
+
+        from .semantic_cache import _cosine
+
+        query = self.cache.embed(intent_name)
+        best_name, best_sim = None, 0.0
+        for name, emb in self.template_embeddings.items():
+            sim = _cosine(query, emb)
+            if sim > best_sim:
+                best_name, best_sim = name, sim
+
+        if best_sim >= TEMPLATE_MATCH_THRESHOLD:
+            return best_name
+        return None
+
+    def plan(
+        self,
+        intent: Dict[str, Any],
+        screen_state: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Instantiate a template plan for this intent, or None if no
+        template applies or required entities are missing
+        """
+        intent_name = intent.get("intent") or ""
+        template_name = self._match_template(intent_name)
+        if template_name is None:
+            return None
+
+        template = PLAN_TEMPLATES[template_name]
+        params = dict(intent.get("entities") or {})
+        if intent.get("target_app"):
+            params.setdefault("target_app", intent["target_app"])
+
+        for required in template["requires"]:
+            if not params.get(required):
+                return None
+
+        if "target_app" in template["requires"]:
+            pkg = resolve_pkg(params["target_app"])
+            if pkg is None:
+                return None
+            params["target_app"] = pkg
+
+        actions = []
+        for step in template["actions"]:
+            actions.append({
+                "action": step["action"],
+                "target": step["target"].format(**params) if step["target"] else None,
+                "value": step["value"].format(**params) if step["value"] else None,
+            })
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Local plan from template '%s' for intent '%s'",
+                template_name, intent_name
+            )
+        return actions
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Semantic cache for LLM responses
+Near-duplicate commands ("Text Mom", "Send a message to Mom") resolve to
+the same cached result instead of repeating the Claude round trip
+"""
+
+import logging
+import orjson
+import sqlite3
+import struct
+import time
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger("SemanticCache")
+
+# Embedding backend is optional; without it the cache degrades to a no-op
+# (numpy ships with sentence-transformers, so one guard covers both)
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    _HAS_EMBEDDER = True
+except ImportError:
+    _HAS_EMBEDDER = False
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+
+def _to_blob(embedding: List[float]) -> bytes:
+    """Pack a float list into a compact float32 blob"""
+    return struct.pack(f"{len(embedding)}f", *embedding)
+
+
+def _from_blob(blob: bytes) -> List[float]:
+    """Unpack a float32 blob back into a float list"""
+    return list(struct.unpack(f"{len(blob) // 4}f", blob))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    """Cosine similarity between two vectors"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(x * x for x in b) ** 0.5
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class SemanticCache:
+    """
+    SQLite-backed embedding cache for LLM call results
+
+    Entries are namespaced (e.g. per user_id and per method) and expire
+    after a TTL. Lookup returns the stored JSON value when the query
+    embedding is within `similarity_threshold` of a cached key.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "semantic_cache.db",
+        similarity_threshold: float = 0.92,
+        ttl_seconds: int = 3600
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.enabled = _HAS_EMBEDDER
+
+        if not self.enabled:
+            logger.warning(
+                "sentence-transformers not installed; semantic cache disabled"
+            )
+            self.conn = None
+            self.embedder = None
+            return
+
+        self.embedder = SentenceTransformer(EMBEDDING_MODEL)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                key_text TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                value_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_namespace "
+            "ON cache_entries (namespace)"
+        )
+        self.conn.commit()
+
+    def embed(self, text: str) -> Optional[List[float]]:
+        """Embed text with the local model"""
+        if not self.enabled:
+            return None
+        return self.embedder.encode(text, normalize_embeddings=True).tolist()
+
+    def get(self, namespace: str, text: str) -> Optional[Any]:
+        """
+        Return the cached value for the closest key in the namespace,
+        or None if nothing is within the similarity threshold
+        """
+        if not self.enabled:
+            return None
+
+        embedding = self.embed(text)
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+
+        # Evict expired rows lazily on read; commit immediately so the
+        # read path never holds a write transaction open against other
+        # workers sharing the database
+        self.conn.execute(
+            "DELETE FROM cache_entries WHERE created_at < ?", (cutoff,)
+        )
+        self.conn.commit()
+
+        rows = self.conn.execute(
+            "SELECT embedding, value_json FROM cache_entries "
+            "WHERE namespace = ? AND created_at >= ?",
+            (namespace, cutoff)
+        ).fetchall()
+
+        if not rows:
+            return None
+
+        # Stored embeddings are normalized at encode time, so cosine
+        # similarity is one matrix-vector product over the namespace
+        query = np.asarray(embedding, dtype=np.float32)
+        matrix = np.stack([
+            np.frombuffer(blob, dtype=np.float32) for blob, _ in rows
+        ])
+        sims = matrix @ query
+        best_idx = int(np.argmax(sims))
+        best_sim = float(sims[best_idx])
+        best_value = rows[best_idx][1]
+
+        if best_value is not None and best_sim >= self.similarity_threshold:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Semantic cache hit (sim={best_sim:.3f}) in {namespace}")
+            return orjson.loads(best_value)
+
+        return None
+
+    def put(self, namespace: str, text: str, value: Any) -> None:
+        """Store a value keyed by the embedding of text"""
+        if not self.enabled:
+            return
+
+        embedding = self.embed(text)
+        self.conn.execute(
+            "INSERT INTO cache_entries (namespace, key_text, embedding, value_json, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (namespace, text, _to_blob(embedding), orjson.dumps(value).decode(), time.time())
+        )
+        self.conn.commit()
+
+
+def plan_cache_key(intent: Dict[str, Any], screen_state: Dict[str, Any]) -> str:
+    """
+    Fingerprint for plan_actions lookups: intent + target app + current
+    app + a bucketed sample of visible texts
+    """
+    visible = sorted(screen_state.get("visible_texts", []))[:10]
+    return "|".join([
+        intent.get("intent") or "",
+        intent.get("target_app") or "",
+        screen_state.get("current_app") or "",
+        ",".join(visible)
+    ])
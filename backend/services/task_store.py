@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Persistent task storage with bounded size
+Replaces the in-memory dict that grew without limit for the lifetime of
+the server process
+"""
+
+import logging
+import orjson
+import sqlite3
+import time
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger("TaskStore")
+
+
+class TaskStore:
+    """
+    SQLite-backed task store with LRU eviction
+
+    Tasks are capped at `max_entries`; when the cap is exceeded the
+    least-recently-accessed rows are dropped. Reads bump recency.
+    """
+
+    def __init__(self, db_path: str = "tasks.db", max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                task_json TEXT NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_last_accessed "
+            "ON tasks (last_accessed)"
+        )
+        self.conn.commit()
+
+    def put(self, task_id: str, task: Dict[str, Any]) -> None:
+        """Store a task and evict the least-recently-used beyond the cap"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, task_json, last_accessed) "
+            "VALUES (?, ?, ?)",
+            (task_id, orjson.dumps(task).decode(), time.time())
+        )
+        self.conn.execute(
+            "DELETE FROM tasks WHERE task_id IN ("
+            "  SELECT task_id FROM tasks "
+            "  ORDER BY last_accessed DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+        self.conn.commit()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a task and refresh its recency, or None if absent"""
+        row = self.conn.execute(
+            "SELECT task_json FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self.conn.execute(
+            "UPDATE tasks SET last_accessed = ? WHERE task_id = ?",
+            (time.time(), task_id)
+        )
+        self.conn.commit()
+        return orjson.loads(row[0])
@@ -0,0 +1,27 @@
+"""
+Import smoke test
+
+Every backend module must import cleanly; an ordering bug in a module
+body (e.g. a constant referencing a name defined further down) takes
+the whole API down at boot, so catch it here.
+"""
+
+import importlib
+
+import pytest
+
+MODULES = [
+    "services.semantic_cache",
+    "services.local_intent",
+    "services.plan_templates",
+    "services.task_store",
+    "services.batched_client",
+    "services.claude_llm_client",
+    "services",
+    "app",
+]
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_imports(module):
+    importlib.import_module(module)
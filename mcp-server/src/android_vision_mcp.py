@@ -14,7 +14,6 @@ from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, asdict
 import asyncio
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("AndroidVisionMCP")
 
 
@@ -286,15 +285,28 @@ class AndroidVisionMCP:
         
         if status == "ELEMENT_NOT_FOUND":
             logger.warning(f"Action {action_index} failed: element not found")
-            
-            # Try replanning
-            new_plan = await self.verifier.replan_after_failure(
-                task_plan,
-                action_index,
-                "Element not found",
-                current_screen_state
+
+            # Confirm the failure and speculatively replan in parallel;
+            # the two LLM calls are independent, so their latency overlaps
+            recovered, new_plan = await asyncio.gather(
+                self.verifier.verify_action_result(
+                    action,
+                    f"{action.target or action.value} visible on screen",
+                    current_screen_state
+                ),
+                self.verifier.replan_after_failure(
+                    task_plan,
+                    action_index,
+                    "Element not found",
+                    current_screen_state
+                )
             )
-            
+
+            if recovered:
+                # Screen caught up after all; keep the original plan
+                logger.debug(f"Action {action_index} recovered on re-check")
+                return task_plan
+
             return new_plan
         
         return None
@@ -303,6 +315,8 @@ class AndroidVisionMCP:
 async def main():
     """Example usage"""
     from mcp_llm_client import MockLLMClient
+
+    logging.basicConfig(level=logging.INFO)
     
     llm = MockLLMClient()  # Replace with real Claude client
     mcp = AndroidVisionMCP(llm)